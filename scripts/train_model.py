@@ -6,34 +6,58 @@ This script trains a logistic regression model to classify endpoints as
 "data" or "non-data" based on extracted features.
 """
 
+from __future__ import annotations
+
 import argparse
-import json
+import os
 import sys
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any, Tuple
-
-import numpy as np
-import pandas as pd
-from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold
-from sklearn.linear_model import LogisticRegression
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.metrics import (
-    classification_report,
-    confusion_matrix,
-    f1_score,
-    precision_score,
-    recall_score,
-    roc_auc_score,
-)
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
-from skl2onnx import convert_sklearn
-from skl2onnx.common.data_types import FloatTensorType, StringTensorType
-
-
-def load_training_data(input_paths: List[str]) -> pd.DataFrame:
-    """Load training data from multiple training.jsonl files."""
+from itertools import chain, compress
+from typing import TYPE_CHECKING, List, Dict, Any, Tuple
+
+import orjson
+
+# Default OpenMP to a single thread in this (parent) process, which does the
+# preprocessing and final fit; CV worker processes are capped separately via
+# inner_max_num_threads in train_model. Must be set before numpy is imported.
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+
+# numpy, pandas, scikit-learn and skl2onnx are imported inside the functions
+# that use them so that `--help` and argument errors return without paying
+# their import cost.
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+
+# Fixed HTTP method vocabulary for the one-hot encoded 'method' feature
+METHODS = ('GET', 'POST', 'PUT', 'DELETE', 'PATCH', 'HEAD', 'OPTIONS')
+METHOD_INDEX = {method: i for i, method in enumerate(METHODS)}
+
+
+def parse_jsonl_lines(path: Path) -> List[Dict[str, Any]]:
+    """Parse a JSONL file line by line, skipping lines that fail to parse."""
+    records = []
+
+    # Stream the file in binary mode; orjson parses the raw bytes directly and
+    # tolerates the trailing newline, so no decode/strip step is needed
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.isspace():
+                continue
+            try:
+                records.append(orjson.loads(line))
+            except orjson.JSONDecodeError as e:
+                print(f"Warning: Failed to parse line in {path}: {e}", file=sys.stderr)
+                continue
+
+    return records
+
+
+def load_training_data(input_paths: List[str]) -> List[Dict[str, Any]]:
+    """Load training records from multiple training.jsonl files."""
     records = []
 
     for input_path in input_paths:
@@ -42,142 +66,128 @@ def load_training_data(input_paths: List[str]) -> pd.DataFrame:
             print(f"Warning: {input_path} does not exist, skipping", file=sys.stderr)
             continue
 
-        with open(path, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    record = json.loads(line)
-                    records.append(record)
-                except json.JSONDecodeError as e:
-                    print(f"Warning: Failed to parse line in {input_path}: {e}", file=sys.stderr)
-                    continue
+        records.extend(parse_jsonl_lines(path))
 
     if not records:
         raise ValueError("No training data loaded. Check input paths.")
 
     print(f"Loaded {len(records)} training examples from {len(input_paths)} file(s)")
-    return pd.DataFrame(records)
+    return records
+
+
+def compute_tfidf(docs: List[List[str]], top_n: int) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Rank terms by corpus TF-IDF and compute per-document TF-IDF for the top N.
+
+    Args:
+        docs: Normalized terms of each document
+
+    Returns:
+        (top_terms, top_scores, doc_tfidf): Top N terms (best first), their corpus
+        TF-IDF scores, and an (n_docs, len(top_terms)) array of per-document TF-IDF
+    """
+    import numpy as np
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    n_docs = len(docs)
+
+    # Term counts depend only on each document's multiset of terms, so
+    # documents with the same terms in any order share a row. Groups are
+    # numbered in first-seen order and weighted by their multiplicity.
+    groups: Dict[Tuple[str, ...], int] = {}
+    inverse = np.fromiter(
+        (groups.setdefault(tuple(sorted(doc)), len(groups)) for doc in docs),
+        dtype=np.intp,
+        count=n_docs,
+    )
+    _, first_idx = np.unique(inverse, return_index=True)
+    unique_docs = [docs[i] for i in first_idx]
+    multiplicity = np.bincount(inverse)
+
+    # Vocabulary in first-seen order so that ties rank by first appearance
+    # (duplicates cannot introduce new terms, so the unique docs suffice)
+    vocabulary = {term: i for i, term in enumerate(dict.fromkeys(chain.from_iterable(unique_docs)))}
+    if not vocabulary:
+        return [], np.empty(0), np.zeros((n_docs, 0))
+
+    # Sparse (n_unique, n_terms) count matrix; docs are already tokenized and
+    # normalized by the caller (key paths keep their case)
+    counts = CountVectorizer(analyzer=list, vocabulary=vocabulary, lowercase=False).fit_transform(unique_docs)
+
+    # Corpus term frequency, document frequency (one stored entry per
+    # document/term pair) and per-document term totals, with each unique
+    # document counted once per original occurrence
+    term_tf = counts.T @ multiplicity
+    row_weights = np.repeat(multiplicity, np.diff(counts.indptr))
+    term_df = np.bincount(counts.indices, weights=row_weights, minlength=len(vocabulary))
+    doc_totals = np.asarray(counts.sum(axis=1)).ravel()
+
+    idf = np.log(n_docs / (term_df + 1e-10))
+    scores = (term_tf / (term_tf.sum() + 1e-10)) * idf
+
+    # Select the top N in O(n_terms): every term scoring at least the Nth best
+    # score is a candidate (in vocabulary order, so ties stay first-seen),
+    # and only the candidates are sorted
+    if 0 < top_n < len(scores):
+        threshold = np.partition(scores, len(scores) - top_n)[len(scores) - top_n]
+        candidates = np.flatnonzero(scores >= threshold)
+        top_idx = candidates[np.argsort(-scores[candidates], kind='stable')[:top_n]]
+    else:
+        top_idx = np.argsort(-scores, kind='stable')[:top_n]
+
+    # Only the selected columns are densified, then broadcast back to the
+    # original documents
+    unique_tfidf = (counts[:, top_idx].toarray() / (doc_totals[:, None] + 1e-10)) * idf[top_idx]
+    doc_tfidf = unique_tfidf[inverse]
+
+    terms = list(vocabulary)
+    return [terms[i] for i in top_idx], scores[top_idx], doc_tfidf
 
 
-def extract_tfidf_features(df: pd.DataFrame, top_n: int = 20) -> Tuple[pd.DataFrame, List[str], Dict[str, Any]]:
+def extract_tfidf_features(records: List[Dict[str, Any]], top_n: int = 20) -> Tuple[pd.DataFrame, List[str], Dict[str, Any]]:
     """
     Compute TF-IDF features from pathTokens and sampleKeyPaths.
     
     Returns:
         (tfidf_df, tfidf_features_list, tfidf_metadata): DataFrame with TF-IDF columns, feature names, and metadata
     """
-    # Initialize dictionaries to store TF and document frequency
-    path_token_tf = {}
-    path_token_df = {}
-    key_path_tf = {}
-    key_path_df = {}
-    
-    n_docs = len(df)
-    
-    # First pass: collect TF and DF for path tokens and key paths
-    for _, row in df.iterrows():
-        path_tokens = row.get('pathTokens', [])
-        sample_key_paths = row.get('sampleKeyPaths', [])
-        
-        # Process path tokens
-        for token in path_tokens:
-            token = str(token).lower()
-            path_token_tf[token] = path_token_tf.get(token, 0) + 1
-        
-        # Track unique tokens per document for DF
-        for token in set(token.lower() for token in path_tokens):
-            path_token_df[token] = path_token_df.get(token, 0) + 1
-        
-        # Process key paths
-        for key_path in sample_key_paths:
-            key_path_str = str(key_path)
-            key_path_tf[key_path_str] = key_path_tf.get(key_path_str, 0) + 1
-        
-        # Track unique paths per document for DF
-        for key_path in set(str(kp) for kp in sample_key_paths):
-            key_path_df[key_path] = key_path_df.get(key_path, 0) + 1
-    
-    # Compute TF-IDF scores
-    path_token_tfidf = {}
-    for token, tf in path_token_tf.items():
-        idf = np.log(n_docs / (path_token_df.get(token, 1) + 1e-10))
-        path_token_tfidf[token] = (tf / (sum(path_token_tf.values()) + 1e-10)) * idf
-    
-    key_path_tfidf = {}
-    for path, tf in key_path_tf.items():
-        idf = np.log(n_docs / (key_path_df.get(path, 1) + 1e-10))
-        key_path_tfidf[path] = (tf / (sum(key_path_tf.values()) + 1e-10)) * idf
-    
-    # Get top N features
-    top_tokens = sorted(path_token_tfidf.items(), key=lambda x: x[1], reverse=True)[:top_n]
-    top_paths = sorted(key_path_tfidf.items(), key=lambda x: x[1], reverse=True)[:top_n]
-    
-    token_names = [t[0] for t in top_tokens]
-    path_names = [p[0] for p in top_paths]
-    
-    # Create feature columns for each row
-    tfidf_data = {}
-    
-    # Add token TF-IDF features
-    for token in token_names:
-        tfidf_data[f'tfidf_token_{token}'] = []
-    
-    # Add path TF-IDF features
-    for path in path_names:
-        tfidf_data[f'tfidf_path_{path}'] = []
-    
-    # Second pass: compute TF-IDF for each document
-    for _, row in df.iterrows():
-        path_tokens = row.get('pathTokens', [])
-        sample_key_paths = row.get('sampleKeyPaths', [])
-        
-        token_tf = {}
-        for token in path_tokens:
-            token = str(token).lower()
-            token_tf[token] = token_tf.get(token, 0) + 1
-        
-        path_tf = {}
-        for path in sample_key_paths:
-            path_str = str(path)
-            path_tf[path_str] = path_tf.get(path_str, 0) + 1
-        
-        # Add token TF-IDF values
-        for token in token_names:
-            tf = token_tf.get(token, 0)
-            idf = np.log(n_docs / (path_token_df.get(token, 1) + 1e-10))
-            tfidf_data[f'tfidf_token_{token}'].append((tf / (sum(token_tf.values()) + 1e-10)) * idf)
-        
-        # Add path TF-IDF values
-        for path in path_names:
-            tf = path_tf.get(path, 0)
-            idf = np.log(n_docs / (key_path_df.get(path, 1) + 1e-10))
-            tfidf_data[f'tfidf_path_{path}'].append((tf / (sum(path_tf.values()) + 1e-10)) * idf)
-    
-    tfidf_df = pd.DataFrame(tfidf_data, index=df.index)
+    import numpy as np
+    import pandas as pd
+
+    # Normalize each record's terms once (path tokens are case-folded, key
+    # paths are not)
+    token_docs = [[str(t).lower() for t in record.get('pathTokens') or []] for record in records]
+    path_docs = [[str(p) for p in record.get('sampleKeyPaths') or []] for record in records]
+
+    token_names, token_scores, token_tfidf = compute_tfidf(token_docs, top_n)
+    path_names, path_scores, path_tfidf = compute_tfidf(path_docs, top_n)
+
+    tfidf_df = pd.DataFrame(
+        np.hstack([token_tfidf, path_tfidf]),
+        columns=[f'tfidf_token_{t}' for t in token_names] + [f'tfidf_path_{p}' for p in path_names],
+    )
     tfidf_feature_names = list(tfidf_df.columns)
     
     # Store metadata for inference
     tfidf_metadata = {
         'token_names': token_names,
         'path_names': path_names,
-        'token_tfidf_scores': {t: float(s) for t, s in top_tokens},
-        'path_tfidf_scores': {p: float(s) for p, s in top_paths},
+        'token_tfidf_scores': {t: float(s) for t, s in zip(token_names, token_scores)},
+        'path_tfidf_scores': {p: float(s) for p, s in zip(path_names, path_scores)},
     }
     
     return tfidf_df, tfidf_feature_names, tfidf_metadata
 
 
-def extract_features(df: pd.DataFrame, include_tfidf: bool = True) -> Tuple[pd.DataFrame, List[str], Dict[str, Any]]:
+def extract_features(records: List[Dict[str, Any]], include_tfidf: bool = True) -> Tuple[pd.DataFrame, List[str], Dict[str, Any]]:
     """
-    Extract features from training data.
+    Extract features from training records.
 
     Returns:
         (features_df, feature_names, metadata): DataFrame with feature columns, list of feature names, and metadata
     """
-    # Extract nested features dict into columns
-    features_df = pd.json_normalize(df['features'])
+    import numpy as np
+    import pandas as pd
 
     # Define numerical features (already numeric)
     numerical_features = [
@@ -202,106 +212,158 @@ def extract_features(df: pd.DataFrame, include_tfidf: bool = True) -> Tuple[pd.D
         'hasDataFlags',
     ]
 
-    # Convert booleans to int
-    for feat in boolean_features:
-        if feat in features_df.columns:
-            features_df[feat] = features_df[feat].astype(int)
+    # Build each column directly from the nested features dicts; missing or
+    # null values become 0
+    feature_dicts = [record['features'] for record in records]
+    n_records = len(feature_dicts)
+
+    # Numerical features: one float32 column each
+    columns = {
+        feat: np.fromiter(
+            (d.get(feat) or 0 for d in feature_dicts),
+            dtype=np.float32,
+            count=n_records,
+        )
+        for feat in numerical_features
+    }
 
-    # Fill missing values with 0
-    for feat in numerical_features + boolean_features:
-        if feat not in features_df.columns:
-            features_df[feat] = 0
-        else:
-            features_df[feat] = features_df[feat].fillna(0)
+    # Boolean features: a single (n_records, n_booleans) int8 block of 0/1
+    bool_block = np.fromiter(
+        (d.get(feat) or 0 for d in feature_dicts for feat in boolean_features),
+        dtype=np.int8,
+        count=n_records * len(boolean_features),
+    ).reshape(n_records, len(boolean_features))
+    for i, feat in enumerate(boolean_features):
+        columns[feat] = bool_block[:, i]
 
     # Extract method (categorical)
-    if 'method' in features_df.columns:
-        features_df['method'] = features_df['method'].fillna('GET')
-    else:
-        features_df['method'] = 'GET'
+    methods = [d.get('method') for d in feature_dicts]
+    columns['method'] = pd.Categorical(['GET' if m is None else m for m in methods])
 
     # Select base features
     selected_features = numerical_features + boolean_features + ['method']
-    features_df = features_df[selected_features].copy()
-    
-    # Extract TF-IDF features if available
+
+    # Extract TF-IDF features if available; their columns are added to the
+    # same dict so the DataFrame is built once, without a concat copy
     metadata = {}
-    if include_tfidf and 'pathTokens' in df.columns and 'sampleKeyPaths' in df.columns:
-        tfidf_df, tfidf_features, tfidf_metadata = extract_tfidf_features(df, top_n=20)
-        features_df = pd.concat([features_df, tfidf_df], axis=1)
+    has_path_tokens = any('pathTokens' in record for record in records)
+    has_key_paths = any('sampleKeyPaths' in record for record in records)
+    if include_tfidf and has_path_tokens and has_key_paths:
+        tfidf_df, tfidf_features, tfidf_metadata = extract_tfidf_features(records, top_n=20)
+        columns.update(zip(tfidf_features, tfidf_df.to_numpy().T))
         selected_features.extend(tfidf_features)
         metadata['tfidf'] = tfidf_metadata
-    
+
+    features_df = pd.DataFrame(columns, copy=False)
+
     return features_df, selected_features, metadata
 
 
-def prepare_labels(df: pd.DataFrame) -> Tuple[np.ndarray, List[str]]:
+def prepare_labels(records: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
     """
     Prepare labels for training.
 
     Filters out 'unsure' labels and converts to binary (0=non-data, 1=data).
 
     Returns:
-        (labels, filtered_indices): Binary labels array and list of kept indices
+        (labels, valid_mask): Binary int8 labels array and boolean mask of kept rows
     """
+    import numpy as np
+    import pandas as pd
+
+    # Encode labels against fixed categories: 'non-data' -> 0, 'data' -> 1,
+    # and 'unsure' (or anything else) -> -1, so filtering is an integer compare
+    codes = pd.Index(['non-data', 'data']).get_indexer(
+        [record.get('label') for record in records]
+    )
+
     # Filter out 'unsure' labels
-    valid_mask = df['label'].isin(['data', 'non-data'])
-    filtered_df = df[valid_mask].copy()
+    valid_mask = codes >= 0
 
-    if len(filtered_df) == 0:
+    if not valid_mask.any():
         raise ValueError("No valid labels found (need 'data' or 'non-data')")
 
-    # Convert to binary: 1 for 'data', 0 for 'non-data'
-    labels = (filtered_df['label'] == 'data').astype(int).values
+    # The category codes already are the binary labels (1=data, 0=non-data)
+    labels = codes[valid_mask].astype(np.int8, copy=False)
+
+    n_data = np.count_nonzero(labels)
+    n_non_data = len(labels) - n_data
 
     print(f"Label distribution after filtering 'unsure':")
-    print(f"  data: {labels.sum()} ({100 * labels.mean():.1f}%)")
-    print(f"  non-data: {(1 - labels).sum()} ({100 * (1 - labels.mean()):.1f}%)")
+    print(f"  data: {n_data} ({100 * n_data / len(labels):.1f}%)")
+    print(f"  non-data: {n_non_data} ({100 * n_non_data / len(labels):.1f}%)")
 
-    return labels, filtered_df.index.tolist()
+    return labels, valid_mask
 
 
-def create_pipeline(feature_names: List[str]) -> Pipeline:
-    """Create sklearn pipeline with preprocessing and model."""
-    # Separate numerical and categorical features
-    numerical_features = [f for f in feature_names if f != 'method']
-    categorical_features = ['method']
-
-    # Get indices for features (needed for ONNX conversion)
-    numerical_indices = [i for i, f in enumerate(feature_names) if f != 'method']
-    categorical_indices = [i for i, f in enumerate(feature_names) if f == 'method']
-
-    # Create column transformer for preprocessing using indices instead of names
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ('num', StandardScaler(), numerical_indices),
-            ('cat', OneHotEncoder(handle_unknown='ignore', sparse_output=False), categorical_indices),
-        ]
+def encode_methods(methods) -> np.ndarray:
+    """One-hot encode HTTP methods against METHODS (unknown methods map to all zeros)."""
+    import numpy as np
+
+    codes = np.fromiter(
+        (METHOD_INDEX.get(method, len(METHODS)) for method in methods),
+        dtype=np.int8,
+        count=len(methods),
     )
 
-    # Create pipeline with preprocessing and model
-    pipeline = Pipeline([
-        ('preprocessor', preprocessor),
-        ('classifier', LogisticRegression(
-            class_weight='balanced',  # Handle class imbalance
-            C=1.0,
-            penalty='l2',
-            solver='lbfgs',
-            max_iter=1000,
-            random_state=42
-        ))
-    ])
+    # One-hot lookup table; the extra all-zero row encodes methods outside METHODS
+    one_hot = np.eye(len(METHODS) + 1, len(METHODS), dtype=np.float32)
+    return one_hot[codes]
 
-    return pipeline
 
+def preprocess(X_num: np.ndarray, methods, scaler: StandardScaler) -> np.ndarray:
+    """
+    Build the model input matrix: scaled numerical block followed by method one-hots.
 
-def train_model(X: pd.DataFrame, y: np.ndarray, feature_names: List[str], verbose: bool = False) -> Tuple[Any, Dict[str, Any], StandardScaler, OneHotEncoder]:
+    Writes into a single preallocated float32 matrix instead of materializing
+    the scaled block and then copying it again with np.hstack.
+    """
+    import numpy as np
+
+    n_num = X_num.shape[1]
+    X_out = np.empty((X_num.shape[0], n_num + len(METHODS)), dtype=np.float32)
+
+    # Same transform as StandardScaler: (x - mean) / scale, done in place
+    X_out_num = X_out[:, :n_num]
+    np.subtract(X_num, scaler.mean_, out=X_out_num)
+    np.divide(X_out_num, scaler.scale_, out=X_out_num)
+
+    X_out[:, n_num:] = encode_methods(methods)
+    return X_out
+
+
+def create_model() -> LogisticRegression:
+    """Create the logistic regression classifier used for CV and final training."""
+    from sklearn.linear_model import LogisticRegression
+
+    return LogisticRegression(
+        class_weight='balanced',  # Handle class imbalance
+        C=1.0,
+        solver='liblinear',
+        max_iter=1000,
+        random_state=42
+    )
+
+
+def train_model(X: pd.DataFrame, y: np.ndarray, feature_names: List[str], verbose: bool = False) -> Tuple[Any, Dict[str, Any], StandardScaler]:
     """
     Train the model with cross-validation.
 
     Returns:
-        (trained_model, metrics, scaler, encoder): Trained model, evaluation metrics, and preprocessing objects
+        (trained_model, metrics, scaler): Trained model, evaluation metrics, and fitted scaler
     """
+    import numpy as np
+    from joblib import parallel_backend
+    from scipy.special import expit
+    from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.metrics import (
+        classification_report,
+        confusion_matrix,
+        precision_recall_fscore_support,
+        roc_auc_score,
+    )
+
     # Split data: 80% train, 20% test (stratified to preserve class distribution)
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, stratify=y, random_state=42
@@ -314,45 +376,35 @@ def train_model(X: pd.DataFrame, y: np.ndarray, feature_names: List[str], verbos
     # Manually preprocess for better ONNX compatibility
     # Separate numerical/TFIDF and categorical features
     numerical_features = [f for f in feature_names if f != 'method']
-    categorical_features = ['method']
 
     # Fit preprocessing on training data
     scaler = StandardScaler()
-    encoder = OneHotEncoder(handle_unknown='ignore', sparse_output=False)
 
-    X_train_num = X_train[numerical_features]
-    X_train_cat = X_train[categorical_features]
-    X_test_num = X_test[numerical_features]
-    X_test_cat = X_test[categorical_features]
+    # Keep the numerical block in float32 so scaling and fitting move half the bytes
+    X_train_num = X_train[numerical_features].to_numpy(dtype=np.float32, copy=False)
+    X_test_num = X_test[numerical_features].to_numpy(dtype=np.float32, copy=False)
 
-    # Fit and transform
-    X_train_num_scaled = scaler.fit_transform(X_train_num)
-    X_train_cat_encoded = encoder.fit_transform(X_train_cat)
-    X_train_preprocessed = np.hstack([X_train_num_scaled, X_train_cat_encoded])
-
-    X_test_num_scaled = scaler.transform(X_test_num)
-    X_test_cat_encoded = encoder.transform(X_test_cat)
-    X_test_preprocessed = np.hstack([X_test_num_scaled, X_test_cat_encoded])
+    # Fit scaler statistics only, then scale into the final matrices in place
+    scaler.fit(X_train_num)
+    X_train_preprocessed = preprocess(X_train_num, X_train['method'], scaler)
+    X_test_preprocessed = preprocess(X_test_num, X_test['method'], scaler)
 
     # Create simple model (no pipeline for ONNX)
-    model = LogisticRegression(
-        class_weight='balanced',
-        C=1.0,
-        solver='lbfgs',
-        max_iter=1000,
-        random_state=42
-    )
-
-    # Create pipeline just for cross-validation
-    pipeline = create_pipeline(feature_names)
+    model = create_model()
 
-    # Cross-validation on training set using pipeline
+    # Cross-validation on the already preprocessed training set. The scaler
+    # statistics come from the full training split, same as the final model.
+    # Folds run in separate loky worker processes, each limited to a single
+    # BLAS/OpenMP thread so the workers don't oversubscribe the cores.
     print(f"\nPerforming 5-fold cross-validation...")
-    cv_scores = cross_val_score(
-        pipeline, X_train, y_train,
-        cv=StratifiedKFold(n_splits=5, shuffle=True, random_state=42),
-        scoring='f1'
-    )
+    with parallel_backend('loky', inner_max_num_threads=1):
+        cv_scores = cross_val_score(
+            create_model(), X_train_preprocessed, y_train,
+            cv=StratifiedKFold(n_splits=5, shuffle=True, random_state=42),
+            scoring='f1',
+            n_jobs=-1,
+            pre_dispatch='2*n_jobs',  # Bound the number of fold copies queued at once
+        )
 
     print(f"Cross-validation F1 scores: {cv_scores}")
     print(f"Mean CV F1: {cv_scores.mean():.3f} ± {cv_scores.std():.3f}")
@@ -362,12 +414,18 @@ def train_model(X: pd.DataFrame, y: np.ndarray, feature_names: List[str], verbos
     model.fit(X_train_preprocessed, y_train)
 
     # Evaluate on preprocessed test set
-    y_pred = model.predict(X_test_preprocessed)
-    y_proba = model.predict_proba(X_test_preprocessed)[:, 1]
-
-    test_f1 = f1_score(y_test, y_pred)
-    test_precision = precision_score(y_test, y_pred)
-    test_recall = recall_score(y_test, y_pred)
+    # Compute the linear score once and derive both predictions and probabilities
+    # (same as predict/predict_proba for binary logistic regression)
+    scores = X_test_preprocessed @ model.coef_[0]
+    scores += model.intercept_[0]
+    y_proba = expit(scores)
+    y_pred = (scores > 0).astype(np.int8)
+
+    # Precision, recall and F1 from a single pass over the predictions
+    test_precision, test_recall, test_f1, _ = precision_recall_fscore_support(
+        y_test, y_pred, average='binary', zero_division=0
+    )
+    cm = confusion_matrix(y_test, y_pred)
     test_auc = roc_auc_score(y_test, y_proba) if len(np.unique(y_test)) > 1 else 0.0
 
     print(f"\nTest set performance:")
@@ -378,7 +436,6 @@ def train_model(X: pd.DataFrame, y: np.ndarray, feature_names: List[str], verbos
 
     if verbose:
         print(f"\nConfusion Matrix:")
-        cm = confusion_matrix(y_test, y_pred)
         print(f"                Predicted")
         print(f"                data  non-data")
         print(f"Actual data     {cm[1,1]:4d}  {cm[1,0]:8d}")
@@ -390,7 +447,7 @@ def train_model(X: pd.DataFrame, y: np.ndarray, feature_names: List[str], verbos
         # Feature importance (logistic regression coefficients)
         # Get feature names after preprocessing
         num_feature_names = numerical_features
-        cat_feature_names = encoder.get_feature_names_out(['method']).tolist()
+        cat_feature_names = [f'method_{method}' for method in METHODS]
         all_feature_names = num_feature_names + cat_feature_names
 
         # Get coefficients
@@ -417,16 +474,19 @@ def train_model(X: pd.DataFrame, y: np.ndarray, feature_names: List[str], verbos
         'test_precision': float(test_precision),
         'test_recall': float(test_recall),
         'test_roc_auc': float(test_auc),
-        'confusion_matrix': confusion_matrix(y_test, y_pred).tolist(),
+        'confusion_matrix': cm.tolist(),
         'n_train': int(len(X_train)),
         'n_test': int(len(X_test)),
     }
 
-    return model, metrics, scaler, encoder
+    return model, metrics, scaler
 
 
-def export_to_onnx(model: LogisticRegression, encoder: OneHotEncoder, output_dir: Path, verbose: bool = False):
+def export_to_onnx(model: LogisticRegression, output_dir: Path, verbose: bool = False):
     """Export trained model to ONNX format."""
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+
     # Get the number of features after preprocessing
     n_features = model.coef_.shape[1]
 
@@ -442,7 +502,7 @@ def export_to_onnx(model: LogisticRegression, encoder: OneHotEncoder, output_dir
         onx = convert_sklearn(
             model,
             initial_types=initial_type,
-            target_opset=12,
+            target_opset=17,
             options={id(model): {'zipmap': False}}  # Don't use ZipMap for cleaner output
         )
     except Exception as e:
@@ -457,6 +517,11 @@ def export_to_onnx(model: LogisticRegression, encoder: OneHotEncoder, output_dir
     print(f"  Saved ONNX model to {onnx_path}")
 
 
+def write_json(path: Path, payload: Dict[str, Any]):
+    """Write a JSON file with 2-space indentation (numpy arrays serialized natively)."""
+    path.write_bytes(orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+
+
 def save_metadata(
     feature_names: List[str],
     metrics: Dict[str, Any],
@@ -478,8 +543,7 @@ def save_metadata(
     }
 
     schema_path = output_dir / 'feature_schema.json'
-    with open(schema_path, 'w') as f:
-        json.dump(feature_schema, f, indent=2)
+    write_json(schema_path, feature_schema)
 
     print(f"  Saved feature schema to {schema_path}")
 
@@ -492,7 +556,7 @@ def save_metadata(
             'class_weight': 'balanced',
             'C': 1.0,
             'penalty': 'l2',
-            'solver': 'lbfgs',
+            'solver': 'liblinear',
             'max_iter': 1000,
         },
         'trainingData': {
@@ -517,38 +581,61 @@ def save_metadata(
         metadata['tfidf'] = tfidf_metadata
 
     metadata_path = output_dir / 'metadata.json'
-    with open(metadata_path, 'w') as f:
-        json.dump(metadata, f, indent=2)
+    write_json(metadata_path, metadata)
 
     print(f"  Saved metadata to {metadata_path}")
 
 
-def save_scaler_params(scaler: StandardScaler, encoder: OneHotEncoder, output_dir: Path):
-    """Save StandardScaler and OneHotEncoder parameters for inference."""
+def save_scaler_params(scaler: StandardScaler, output_dir: Path):
+    """
+    Save StandardScaler parameters and the method vocabulary for inference.
+
+    Writes scaler.json and encoder.json for the TypeScript predictor, plus
+    scaler.npz (the scaler parameters as float32 arrays) for loading with
+    np.load and preproc.joblib (the fitted scaler and method vocabulary) for
+    reuse from Python.
+    """
+    import joblib
+    import numpy as np
+
     scaler_params = {
-        'mean': scaler.mean_.tolist(),
-        'scale': scaler.scale_.tolist(),
-        'var': scaler.var_.tolist(),
+        'mean': scaler.mean_,
+        'scale': scaler.scale_,
+        'var': scaler.var_,
     }
 
     scaler_path = output_dir / 'scaler.json'
-    with open(scaler_path, 'w') as f:
-        json.dump(scaler_params, f, indent=2)
+    write_json(scaler_path, scaler_params)
 
     print(f"  Saved scaler parameters to {scaler_path}")
 
-    # Save encoder categories
+    # Same parameters as a compressed binary blob; float32 matches the dtype
+    # of the feature matrix
+    scaler_npz_path = output_dir / 'scaler.npz'
+    np.savez_compressed(
+        scaler_npz_path,
+        **{name: np.asarray(values, dtype=np.float32) for name, values in scaler_params.items()},
+    )
+
+    print(f"  Saved scaler arrays (npz) to {scaler_npz_path}")
+
+    # Save method vocabulary in the OneHotEncoder layout the predictor expects
     encoder_params = {
-        'categories': [cat.tolist() for cat in encoder.categories_],
-        'feature_names': encoder.get_feature_names_out(['method']).tolist(),
+        'categories': [list(METHODS)],
+        'feature_names': [f'method_{method}' for method in METHODS],
     }
 
     encoder_path = output_dir / 'encoder.json'
-    with open(encoder_path, 'w') as f:
-        json.dump(encoder_params, f, indent=2)
+    write_json(encoder_path, encoder_params)
 
     print(f"  Saved encoder parameters to {encoder_path}")
 
+    # Fitted scaler as a compressed pickle for fast reuse from Python
+    preproc_path = output_dir / 'preproc.joblib'
+    joblib.dump({'scaler': scaler, 'methods': METHODS}, preproc_path, compress=3)
+
+    print(f"  Saved preprocessing objects to {preproc_path}")
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -581,28 +668,29 @@ def main():
     print(f"=" * 60)
 
     # Load training data
-    df = load_training_data(args.input)
+    records = load_training_data(args.input)
 
     # Prepare labels (filter out 'unsure')
-    labels, valid_indices = prepare_labels(df)
+    labels, valid_mask = prepare_labels(records)
 
-    # Extract features (including TF-IDF)
-    features_df, feature_names, feature_metadata = extract_features(df.iloc[valid_indices])
+    # Extract features (including TF-IDF) from the labelled records only
+    features_df, feature_names, feature_metadata = extract_features(list(compress(records, valid_mask)))
 
     # Class distribution for metadata
+    n_data = int(labels.sum())
     class_distribution = {
-        'data': int(labels.sum()),
-        'non-data': int((1 - labels).sum()),
+        'data': n_data,
+        'non-data': len(labels) - n_data,
     }
 
     # Train model
-    model, metrics, scaler, encoder = train_model(features_df, labels, feature_names, verbose=args.verbose)
+    model, metrics, scaler = train_model(features_df, labels, feature_names, verbose=args.verbose)
 
     # Export to ONNX
-    export_to_onnx(model, encoder, output_dir, verbose=args.verbose)
+    export_to_onnx(model, output_dir, verbose=args.verbose)
 
     # Save scaler and encoder parameters
-    save_scaler_params(scaler, encoder, output_dir)
+    save_scaler_params(scaler, output_dir)
 
     # Save metadata (including TF-IDF)
     save_metadata(